@@ -0,0 +1,265 @@
+"""
+Exportación masiva del catálogo de productos mediante COPY ... TO STDOUT.
+
+Pensado para jobs batch que necesitan snapshots completos (o incrementales)
+del catálogo fuera del camino Datastream/BigQuery. Los datos se transmiten en
+streaming desde PostgreSQL al destino por bloques, sin cargar la tabla en memoria.
+
+Uso:
+    python export_products.py --format csv --output products.csv
+    python export_products.py --format ndjson --since-created-at 2024-01-01T00:00:00 > delta.ndjson
+    python export_products.py --format parquet --since-id 125000 --output delta.parquet
+
+Al terminar se escribe en stderr la marca de agua para usarla como
+--since-id / --since-created-at en la siguiente ejecución: solo se calcula la
+del modo elegido (max(id) por la clave primaria, max(created_at) por el índice
+idx_products_created_at creado por db-bootstrap o a mano, ver README), sin
+escanear la tabla.
+
+Ni el id SERIAL ni created_at (hora de inicio de la transacción) siguen el
+orden de commit: una transacción puede obtener un valor por debajo de la marca
+de agua y confirmarse después del snapshot. Por eso cada exportación
+incremental vuelve a leer una ventana de solape por debajo de la marca
+(--overlap-ids, --overlap) y los consumidores deben deduplicar por id. Las filas
+de transacciones abiertas durante más tiempo que el solape pueden perderse.
+Las exportaciones incrementales solo recogen altas: los cambios de `available`
+sobre productos ya exportados requieren un snapshot completo.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+import boto3
+import psycopg2
+
+COLUMNS = ['id', 'name', 'price', 'description', 'available', 'created_at']
+FORMATS = ['csv', 'ndjson', 'parquet']
+
+# Tamaño de bloque de COPY y de los row groups de Parquet
+COPY_CHUNK_SIZE = 1024 * 1024
+PARQUET_BLOCK_SIZE = 16 * 1024 * 1024
+
+# Ventana de solape por defecto para las exportaciones incrementales
+OVERLAP_IDS = 1000
+OVERLAP = '15 minutes'
+
+
+def get_connection():
+    """Conecta con DB_PASSWORD si está definida (p.ej. PostgreSQL local) o con un token IAM de RDS"""
+    db_host = os.environ.get('DB_HOST')
+    db_name = os.environ.get('DB_NAME')
+    db_username = os.environ.get('DB_USERNAME')
+    db_port = int(os.environ.get('DB_PORT', '5432'))
+
+    if not all([db_host, db_name, db_username]):
+        raise Exception("Configuración de base de datos incompleta")
+
+    # Limpiar el endpoint de RDS (quitar el puerto si viene incluido)
+    if ':' in db_host:
+        db_host = db_host.split(':')[0]
+
+    db_password = os.environ.get('DB_PASSWORD')
+    # SSL obligatorio por defecto, como en las Lambdas; un PostgreSQL local sin SSL usa DB_SSLMODE=disable
+    sslmode = os.environ.get('DB_SSLMODE', 'require')
+    if not db_password:
+        try:
+            rds_client = boto3.client('rds')
+            db_password = rds_client.generate_db_auth_token(
+                DBHostname=db_host,
+                Port=db_port,
+                DBUsername=db_username
+            )
+        except Exception as e:
+            raise Exception(f"No se puede conectar con IAM ni con contraseña: {str(e)}")
+
+    return psycopg2.connect(
+        host=db_host,
+        port=db_port,
+        database=db_name,
+        user=db_username,
+        password=db_password,
+        sslmode=sslmode
+    )
+
+
+def build_select(since_created_at=None, since_id=None):
+    """Construye la SELECT filtrada por la marca de agua anterior menos la ventana de solape"""
+    conditions = []
+    if since_created_at is not None:
+        conditions.append("created_at > %(since_created_at)s::timestamp - %(overlap)s::interval")
+    if since_id is not None:
+        conditions.append("id > %(since_id)s - %(overlap_ids)s")
+    # Sin ORDER BY: el seq scan es lo que permite leer la tabla a velocidad de disco
+    select = f"SELECT {', '.join(COLUMNS)} FROM products"
+    if conditions:
+        select += f" WHERE {' AND '.join(conditions)}"
+    return select
+
+
+def build_copy(select, fmt):
+    if fmt == 'ndjson':
+        # row_to_json ya escapa los caracteres de control; QUOTE/DELIMITER improbables
+        # evitan que COPY vuelva a escapar las barras invertidas del JSON
+        return (
+            f"COPY (SELECT row_to_json(t) FROM ({select}) t) TO STDOUT "
+            "WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+        )
+    # CSV también es el formato intermedio para Parquet
+    return f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+
+
+def write_parquet(read_stream, output):
+    """Convierte el CSV de COPY a Parquet por lotes, sin materializar la tabla"""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("El formato parquet requiere pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ('id', pa.int32()),
+        ('name', pa.string()),
+        ('price', pa.decimal128(10, 2)),
+        ('description', pa.string()),
+        ('available', pa.bool_()),
+        ('created_at', pa.timestamp('us'))
+    ])
+    reader = pa_csv.open_csv(
+        read_stream,
+        read_options=pa_csv.ReadOptions(block_size=PARQUET_BLOCK_SIZE),
+        # description viene de un <textarea>: COPY entrecomilla los saltos de línea,
+        # pero el troceado por bloques de pyarrow solo los respeta con esta opción
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=schema,
+            true_values=['t'],
+            false_values=['f'],
+            # COPY escribe NULL como campo vacío sin comillas y '' como ""
+            null_values=[''],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False
+        )
+    )
+    writer = pq.ParquetWriter(output, schema)
+    try:
+        for batch in reader:
+            writer.write_batch(batch)
+    finally:
+        writer.close()
+
+
+def copy_to(cursor, copy_sql, params, output):
+    cursor.copy_expert(cursor.mogrify(copy_sql, params).decode(), output, size=COPY_CHUNK_SIZE)
+
+
+def copy_to_parquet(cursor, copy_sql, params, output):
+    """COPY escribe en un pipe desde un hilo mientras pyarrow lo consume y genera Parquet"""
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        with os.fdopen(write_fd, 'wb') as write_stream:
+            try:
+                copy_to(cursor, copy_sql, params, write_stream)
+            except Exception as e:
+                errors.append(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    parquet_error = None
+    try:
+        with os.fdopen(read_fd, 'rb') as read_stream:
+            write_parquet(read_stream, output)
+    except Exception as e:
+        parquet_error = e
+    finally:
+        producer.join()
+
+    # Si COPY falla, pyarrow solo ve un CSV truncado: el error de la base de datos va primero.
+    # Si el que falla es pyarrow, el productor solo ve el pipe cerrado
+    if errors and not (parquet_error and isinstance(errors[0], BrokenPipeError)):
+        raise errors[0] from parquet_error
+    if parquet_error:
+        raise parquet_error
+
+
+def export_products(conn, output, fmt='csv', since_created_at=None, since_id=None,
+                    overlap_ids=OVERLAP_IDS, overlap=OVERLAP):
+    """
+    Exporta la tabla products al fichero binario `output` en el formato indicado.
+    Devuelve la marca de agua del snapshot exportado: {'max_created_at'} en modo
+    --since-created-at y {'max_id'} en el resto (snapshot completo o --since-id).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt}")
+
+    # Snapshot consistente: la marca de agua y el COPY ven los mismos datos
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    cursor = conn.cursor()
+    try:
+        # El parseo de timestamps de pyarrow y el formato de NDJSON dependen del DateStyle ISO
+        cursor.execute("SET DateStyle TO ISO, MDY;")
+        params = {
+            'since_created_at': since_created_at,
+            'since_id': since_id,
+            'overlap_ids': overlap_ids,
+            'overlap': overlap
+        }
+        if since_created_at is not None:
+            cursor.execute("SELECT max(created_at) FROM products;")
+            max_created_at = cursor.fetchone()[0]
+            watermark = {
+                'max_created_at': max_created_at.isoformat() if max_created_at else since_created_at
+            }
+        else:
+            cursor.execute("SELECT max(id) FROM products;")
+            max_id = cursor.fetchone()[0]
+            watermark = {'max_id': max_id if max_id is not None else since_id}
+
+        select = build_select(since_created_at, since_id)
+        copy_sql = build_copy(select, fmt)
+        if fmt == 'parquet':
+            copy_to_parquet(cursor, copy_sql, params, output)
+        else:
+            copy_to(cursor, copy_sql, params, output)
+        conn.commit()
+    finally:
+        cursor.close()
+
+    return watermark
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta el catálogo de productos en streaming")
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--output', help="Fichero de salida (por defecto stdout)")
+    parser.add_argument('--since-created-at', help="Exportar solo productos con created_at posterior (ISO 8601)")
+    parser.add_argument('--since-id', type=int, help="Exportar solo productos con id posterior")
+    parser.add_argument('--overlap-ids', type=int, default=OVERLAP_IDS,
+                        help="Ids por debajo de --since-id que se vuelven a exportar (deduplicar por id)")
+    parser.add_argument('--overlap', default=OVERLAP,
+                        help="Intervalo por debajo de --since-created-at que se vuelve a exportar (deduplicar por id)")
+    args = parser.parse_args(argv)
+
+    conn = get_connection()
+    try:
+        if args.output:
+            with open(args.output, 'wb') as output:
+                watermark = export_products(conn, output, args.format,
+                                            args.since_created_at, args.since_id,
+                                            args.overlap_ids, args.overlap)
+        else:
+            watermark = export_products(conn, sys.stdout.buffer, args.format,
+                                        args.since_created_at, args.since_id,
+                                        args.overlap_ids, args.overlap)
+    finally:
+        conn.close()
+
+    print(json.dumps(watermark), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
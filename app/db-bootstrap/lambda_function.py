@@ -16,6 +16,9 @@ def lambda_handler(event, context):
             sslmode='require'
         )
         
+        # CREATE INDEX CONCURRENTLY no puede ir dentro de una transacción; el resto
+        # de comandos ya se confirmaba uno a uno
+        conn.autocommit = True
         cur = conn.cursor()
         
         # Comandos de configuración para Datastream
@@ -26,7 +29,9 @@ def lambda_handler(event, context):
             f"GRANT rds_replication TO {os.environ['DATASTREAM_USER']};",
             f"GRANT USAGE ON SCHEMA public TO {os.environ['DATASTREAM_USER']};",
             f"GRANT SELECT ON ALL TABLES IN SCHEMA public TO {os.environ['DATASTREAM_USER']};",
-            f"ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT SELECT ON TABLES TO {os.environ['DATASTREAM_USER']};"
+            f"ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT SELECT ON TABLES TO {os.environ['DATASTREAM_USER']};",
+            # Índice para la exportación incremental del catálogo (app/catalog-export); falla si la tabla aún no existe
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_created_at ON products (created_at);"
         ]
         
         results = []
@@ -1,7 +1,9 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
-import requests
 import os
 import logging
+import threading
+
+from resilience import LambdaClient, CircuitOpenError
 
 app = Flask(__name__)
 # TODO SEGURIDAD: Configurar SECRET_KEY como variable de entorno en producción
@@ -16,23 +18,46 @@ LAMBDA_GET_PRODUCTS_URL = os.environ.get('GET_PRODUCTS_URL', '')
 LAMBDA_GET_ITEM_URL = os.environ.get('GET_ITEM_URL', '')
 LAMBDA_ADD_PRODUCT_URL = os.environ.get('ADD_PRODUCT_URL', '')
 
-@app.route('/')
-def index():
-    """Página principal del ecommerce"""
+# Clientes por endpoint: latencia, circuit breaker y hedging solo para lecturas idempotentes
+get_products_client = LambdaClient('get_products', LAMBDA_GET_PRODUCTS_URL, hedge=True)
+get_item_client = LambdaClient('get_item', LAMBDA_GET_ITEM_URL)
+add_product_client = LambdaClient('add_product', LAMBDA_ADD_PRODUCT_URL)
+
+# Última respuesta correcta del catálogo, servida cuando el upstream falla
+_products_cache = {'products': None}
+_products_cache_lock = threading.Lock()
+
+def fetch_products():
+    """Obtiene el catálogo de la Lambda; devuelve (productos, degradado)"""
     try:
-        # Obtener productos de la función Lambda
-        if LAMBDA_GET_PRODUCTS_URL:
-            response = requests.get(LAMBDA_GET_PRODUCTS_URL, timeout=10)
-            if response.status_code == 200:
-                products = response.json()
-            else:
-                logger.error(f"Error al obtener productos: {response.status_code}")
-                products = []
-        else:
-            logger.warning("GET_PRODUCTS_URL no configurada")
-            products = []
+        response = get_products_client.get()
+        if response.status_code == 200:
+            products = response.json()
+            with _products_cache_lock:
+                _products_cache['products'] = products
+            return products, False
+        logger.error(f"Error al obtener productos: {response.status_code}")
+    except CircuitOpenError as e:
+        logger.warning(str(e))
     except Exception as e:
         logger.error(f"Error conectando con Lambda GetProducts: {str(e)}")
+
+    with _products_cache_lock:
+        cached = _products_cache['products']
+    return cached, True
+
+@app.route('/')
+def index():
+    """Página principal del ecommerce"""
+    # Obtener productos de la función Lambda
+    if LAMBDA_GET_PRODUCTS_URL:
+        products, degraded = fetch_products()
+        if degraded:
+            flash("Catálogo temporalmente no disponible, se muestran datos en caché" if products is not None
+                  else "Catálogo temporalmente no disponible", 'error')
+        products = products or []
+    else:
+        logger.warning("GET_PRODUCTS_URL no configurada")
         products = []
     
     return render_template('index.html', products=products)
@@ -42,11 +67,13 @@ def list_products():
     """API endpoint para listar productos"""
     try:
         if LAMBDA_GET_PRODUCTS_URL:
-            response = requests.get(LAMBDA_GET_PRODUCTS_URL, timeout=10)
-            if response.status_code == 200:
-                return jsonify(response.json())
-            else:
-                return jsonify({"error": "Error al obtener productos"}), 500
+            products, degraded = fetch_products()
+            if products is None:
+                return jsonify({"error": "Error al obtener productos"}), 503
+            response = jsonify(products)
+            if degraded:
+                response.headers['Warning'] = '110 - "Response is Stale"'
+            return response
         else:
             return jsonify({"error": "Configuración de Lambda no disponible"}), 500
     except Exception as e:
@@ -59,9 +86,7 @@ def buy_product(product_id):
     try:
         if LAMBDA_GET_ITEM_URL:
             # Enviar request a Lambda GetItem para simular compra
-            response = requests.post(LAMBDA_GET_ITEM_URL, 
-                                   json={"product_id": product_id}, 
-                                   timeout=10)
+            response = get_item_client.post(json={"product_id": product_id})
             if response.status_code == 200:
                 result = response.json()
                 if 'error' in result:
@@ -72,6 +97,9 @@ def buy_product(product_id):
                 flash("Error al procesar la compra", 'error')
         else:
             flash("Función de compra no disponible", 'error')
+    except CircuitOpenError as e:
+        logger.warning(str(e))
+        flash("Servicio de compra temporalmente no disponible, inténtalo más tarde", 'error')
     except Exception as e:
         logger.error(f"Error en compra: {str(e)}")
         flash("Error interno al procesar la compra", 'error')
@@ -111,9 +139,7 @@ def add_product():
                 "price": price,
                 "description": description
             }
-            response = requests.post(LAMBDA_ADD_PRODUCT_URL, 
-                                   json=product_data, 
-                                   timeout=10)
+            response = add_product_client.post(json=product_data)
             if response.status_code in [200, 201]:
                 result = response.json()
                 if 'error' in result:
@@ -125,6 +151,9 @@ def add_product():
                 flash("Error al añadir el producto", 'error')
         else:
             flash("Función de añadir producto no disponible", 'error')
+    except CircuitOpenError as e:
+        logger.warning(str(e))
+        flash("Servicio de alta de productos temporalmente no disponible, inténtalo más tarde", 'error')
     except Exception as e:
         logger.error(f"Error añadiendo producto: {str(e)}")
         flash("Error interno al añadir producto", 'error')
@@ -140,6 +169,10 @@ def health_check():
             "get_products": bool(LAMBDA_GET_PRODUCTS_URL),
             "get_item": bool(LAMBDA_GET_ITEM_URL),
             "add_product": bool(LAMBDA_ADD_PRODUCT_URL)
+        },
+        "upstreams": {
+            client.name: client.stats()
+            for client in (get_products_client, get_item_client, add_product_client)
         }
     })
 
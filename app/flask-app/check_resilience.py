@@ -0,0 +1,135 @@
+"""
+Comprobación automática del hedging y del circuit breaker contra local_lambda.py.
+
+Arranca el sustituto local en un puerto libre, inyecta fallos y verifica que:
+- se envía un hedge cuando una llamada supera el p95 y responde la copia rápida
+- sin presupuesto (HEDGE_BURST=1 ya gastado) no se duplican más llamadas
+- el circuito se abre, / y /products sirven el catálogo en caché (cabecera Warning)
+- tras el cooldown pasa a half-open, vuelve a abrirse si la prueba falla y se cierra si va bien
+- un resultado de una llamada anterior a la apertura no cierra el circuito en half-open
+
+Uso:
+    python check_resilience.py
+"""
+import os
+import sys
+import threading
+import time
+
+# Configuración antes de importar la app: las URLs y umbrales se leen al importar
+os.environ.setdefault('BREAKER_COOLDOWN', '1')
+os.environ.setdefault('LAMBDA_TIMEOUT', '3')
+os.environ.setdefault('HEDGE_BURST', '1')
+
+from werkzeug.serving import make_server
+
+import local_lambda
+
+server = make_server('127.0.0.1', 0, local_lambda.app, threaded=True)
+base_url = f"http://127.0.0.1:{server.server_port}"
+os.environ['GET_PRODUCTS_URL'] = f"{base_url}/get_products"
+os.environ['GET_ITEM_URL'] = f"{base_url}/get_item"
+os.environ['ADD_PRODUCT_URL'] = f"{base_url}/add_product"
+
+import app as flask_app
+from resilience import HEDGE_MIN_SAMPLES, BREAKER_COOLDOWN, CircuitBreaker
+
+failures = []
+
+def check(condition, message):
+    if condition:
+        print(f"✅ {message}")
+    else:
+        print(f"❌ {message}")
+        failures.append(message)
+
+def set_faults(**values):
+    local_lambda.faults.update(values)
+
+def main():
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = flask_app.app.test_client()
+    products = flask_app.get_products_client
+
+    # Calentamiento: suficientes muestras rápidas para tener p95
+    set_faults(latency_ms=20, slow_rate=0, slow_ms=1500, error_rate=0, slow_next=0)
+    for _ in range(HEDGE_MIN_SAMPLES + 5):
+        client.get('/products')
+    check(products.hedges_sent == 0, "Sin hedges mientras la latencia es estable")
+
+    # Una sola llamada lenta (cold start): el hedge responde mucho antes
+    set_faults(slow_next=1)
+    start = time.monotonic()
+    response = client.get('/products')
+    elapsed = time.monotonic() - start
+    check(response.status_code == 200, "La llamada con hedge devuelve el catálogo")
+    check(products.hedges_sent == 1, "Se envía un hedge al superar el p95")
+    check(elapsed < 1.0, f"El hedge evita la espera de 1.5s (tardó {elapsed:.2f}s)")
+
+    # Presupuesto agotado: la siguiente llamada lenta espera sin duplicarse
+    set_faults(slow_next=1)
+    start = time.monotonic()
+    client.get('/products')
+    elapsed = time.monotonic() - start
+    check(products.hedges_sent == 1, "Sin presupuesto no se envía otro hedge")
+    check(elapsed >= 1.4, f"La llamada sin hedge espera a la Lambda lenta ({elapsed:.2f}s)")
+
+    # Errores del upstream: el circuito se abre
+    set_faults(error_rate=1.0)
+    for _ in range(30):
+        client.get('/products')
+        if products.breaker.state == 'open':
+            break
+    check(products.breaker.state == 'open', "El circuito se abre con la tasa de error")
+
+    start = time.monotonic()
+    response = client.get('/products')
+    elapsed = time.monotonic() - start
+    check(response.status_code == 200 and len(response.get_json()) > 0,
+          "/products sirve el catálogo en caché con el circuito abierto")
+    check('Warning' in response.headers, "/products marca la respuesta como obsoleta (Warning)")
+    check(elapsed < 0.1, f"Fallo rápido sin llamar a la Lambda ({elapsed * 1000:.1f}ms)")
+    response = client.get('/')
+    check(response.status_code == 200 and 'Producto 1' in response.get_data(as_text=True),
+          "/ sirve el catálogo en caché con el circuito abierto")
+
+    # Half-open: la llamada de prueba falla y el circuito vuelve a abrirse
+    time.sleep(BREAKER_COOLDOWN + 0.1)
+    check(products.breaker.state == 'half_open', "Tras el cooldown pasa a half-open")
+    client.get('/products')
+    check(products.breaker.state == 'open', "Si la prueba falla el circuito se reabre")
+
+    # Recuperación: la prueba va bien y el circuito se cierra
+    set_faults(error_rate=0)
+    time.sleep(BREAKER_COOLDOWN + 0.1)
+    response = client.get('/products')
+    check(response.status_code == 200 and 'Warning' not in response.headers,
+          "Tras recuperarse se sirven datos frescos")
+    check(products.breaker.state == 'closed', "Si la prueba va bien el circuito se cierra")
+
+    # Carrera: una llamada lanzada antes de la apertura termina durante la prueba
+    breaker = CircuitBreaker(window=4, min_requests=2, error_rate=0.5, cooldown=0.1)
+    stale = breaker.allow_request()
+    breaker.record_failure(breaker.allow_request())
+    breaker.record_failure(breaker.allow_request())
+    time.sleep(0.15)
+    probe = breaker.allow_request()
+    check(probe is not None and breaker.allow_request() is None,
+          "En half-open solo se deja pasar una llamada de prueba")
+    breaker.record_success(stale)
+    check(breaker.state == 'half_open', "Un éxito antiguo no cierra el circuito durante la prueba")
+    breaker.record_failure(stale)
+    check(breaker.state == 'half_open', "Un fallo antiguo no reabre el circuito durante la prueba")
+    breaker.record_failure(probe)
+    check(breaker.state == 'open', "Solo el resultado de la prueba reabre el circuito")
+    breaker.record_success(probe)
+    check(breaker.state == 'open', "Un ticket de prueba ya resuelto no cierra el circuito")
+
+    server.shutdown()
+    if failures:
+        print(f"{len(failures)} comprobaciones fallidas")
+        sys.exit(1)
+    print("Todas las comprobaciones correctas")
+
+if __name__ == '__main__':
+    main()
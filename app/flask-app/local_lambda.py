@@ -0,0 +1,126 @@
+"""
+Sustituto local de las funciones Lambda con inyección de fallos.
+
+Expone GetProducts, GetItem y AddProduct sobre un catálogo en memoria para
+ejercitar el hedging y el circuit breaker de la app sin desplegar en AWS.
+
+Uso:
+    FAULT_LATENCY_MS=50 FAULT_SLOW_RATE=0.1 FAULT_SLOW_MS=3000 FAULT_ERROR_RATE=0.2 \\
+        python local_lambda.py
+    GET_PRODUCTS_URL=http://localhost:9000/get_products \\
+    GET_ITEM_URL=http://localhost:9000/get_item \\
+    ADD_PRODUCT_URL=http://localhost:9000/add_product python app.py
+
+La configuración de fallos también puede cambiarse en caliente con
+POST /faults {"error_rate": 1.0} para forzar la apertura del circuito, o
+{"slow_next": 1} para que solo la siguiente petición sea lenta.
+
+check_resilience.py arranca este sustituto y comprueba hedging y circuit breaker.
+"""
+from flask import Flask, request, jsonify
+from datetime import datetime
+import os
+import random
+import threading
+import time
+
+app = Flask(__name__)
+
+# Parámetros de inyección de fallos
+faults = {
+    'latency_ms': float(os.environ.get('FAULT_LATENCY_MS', '20')),
+    'slow_rate': float(os.environ.get('FAULT_SLOW_RATE', '0')),
+    'slow_ms': float(os.environ.get('FAULT_SLOW_MS', '3000')),
+    'error_rate': float(os.environ.get('FAULT_ERROR_RATE', '0')),
+    # Número de próximas peticiones que serán lentas (para pruebas deterministas)
+    'slow_next': 0
+}
+
+_lock = threading.Lock()
+_products = [
+    {
+        'id': i,
+        'name': f'Producto {i}',
+        'price': round(9.99 * i, 2),
+        'description': f'Producto de prueba {i}',
+        'available': True,
+        'created_at': datetime.now().isoformat()
+    }
+    for i in range(1, 11)
+]
+
+def inject_faults():
+    """Aplica la latencia (con cola lenta tipo cold start) y devuelve un error si toca"""
+    delay = faults['latency_ms']
+    with _lock:
+        slow = faults['slow_next'] > 0
+        if slow:
+            faults['slow_next'] -= 1
+    if slow or random.random() < faults['slow_rate']:
+        delay = faults['slow_ms']
+    time.sleep(delay / 1000.0)
+    if random.random() < faults['error_rate']:
+        return jsonify({'error': 'Error interno del servidor', 'message': 'Fallo inyectado'}), 500
+    return None
+
+@app.route('/get_products', methods=['GET'])
+def get_products():
+    error = inject_faults()
+    if error:
+        return error
+    with _lock:
+        return jsonify(list(reversed(_products)))
+
+@app.route('/get_item', methods=['POST'])
+def get_item():
+    error = inject_faults()
+    if error:
+        return error
+    product_id = (request.get_json(silent=True) or {}).get('product_id')
+    if not product_id:
+        return jsonify({'error': 'product_id es requerido'}), 400
+    with _lock:
+        product = next((p for p in _products if p['id'] == product_id), None)
+        if not product:
+            return jsonify({'error': 'Producto no encontrado'}), 404
+        if not product['available']:
+            return jsonify({'error': f'El producto "{product["name"]}" ya no está disponible'}), 400
+        product['available'] = False
+    return jsonify({
+        'message': f'Producto "{product["name"]}" comprado exitosamente',
+        'product_id': product_id,
+        'product_name': product['name']
+    })
+
+@app.route('/add_product', methods=['POST'])
+def add_product():
+    error = inject_faults()
+    if error:
+        return error
+    body = request.get_json(silent=True) or {}
+    if not body.get('name') or not body.get('price'):
+        return jsonify({'error': 'name y price son campos requeridos'}), 400
+    with _lock:
+        product = {
+            'id': len(_products) + 1,
+            'name': body['name'],
+            'price': float(body['price']),
+            'description': body.get('description', ''),
+            'available': True,
+            'created_at': datetime.now().isoformat()
+        }
+        _products.append(product)
+    return jsonify({'message': 'Producto añadido exitosamente', 'product': product}), 201
+
+@app.route('/faults', methods=['GET', 'POST'])
+def configure_faults():
+    """Consulta o modifica los parámetros de inyección de fallos"""
+    if request.method == 'POST':
+        for key, value in (request.get_json(silent=True) or {}).items():
+            if key in faults:
+                faults[key] = float(value)
+    return jsonify(faults)
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 9000))
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
@@ -0,0 +1,290 @@
+import os
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Parámetros de resiliencia para las llamadas Flask -> Lambda (configurables por entorno)
+LAMBDA_TIMEOUT = float(os.environ.get('LAMBDA_TIMEOUT', '10'))
+LATENCY_WINDOW = int(os.environ.get('LATENCY_WINDOW', '200'))
+HEDGE_MIN_SAMPLES = int(os.environ.get('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_RATIO = float(os.environ.get('HEDGE_RATIO', '0.1'))
+HEDGE_BURST = float(os.environ.get('HEDGE_BURST', '5'))
+HEDGE_POOL_SIZE = int(os.environ.get('HEDGE_POOL_SIZE', '16'))
+BREAKER_WINDOW = int(os.environ.get('BREAKER_WINDOW', '20'))
+BREAKER_MIN_REQUESTS = int(os.environ.get('BREAKER_MIN_REQUESTS', '10'))
+BREAKER_ERROR_RATE = float(os.environ.get('BREAKER_ERROR_RATE', '0.5'))
+BREAKER_COOLDOWN = float(os.environ.get('BREAKER_COOLDOWN', '30'))
+
+# Pool compartido para las peticiones de cobertura (hedged requests). Los huecos se
+# reservan antes de enviar para no encolar nunca: si el pool está lleno no hay hedge
+_executor = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix='lambda-hedge')
+_executor_slots = threading.BoundedSemaphore(HEDGE_POOL_SIZE)
+
+
+def _submit(fn, *args, **kwargs):
+    """Envía al pool solo si hay un worker libre; devuelve None en caso contrario"""
+    if not _executor_slots.acquire(blocking=False):
+        return None
+    future = _executor.submit(fn, *args, **kwargs)
+    future.add_done_callback(lambda _: _executor_slots.release())
+    return future
+
+
+class CircuitOpenError(Exception):
+    """El circuito de un upstream está abierto y la llamada se rechaza sin salir de la app"""
+
+
+class LatencyTracker:
+    """Ventana deslizante de latencias (en segundos) por endpoint"""
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def count(self):
+        with self._lock:
+            return len(self._samples)
+
+
+class HedgeBudget:
+    """
+    Token bucket que limita los hedges a HEDGE_RATIO de las llamadas (con ráfagas
+    de hasta HEDGE_BURST), para no duplicar la carga cuando toda la latencia sube
+    """
+
+    def __init__(self, ratio=HEDGE_RATIO, burst=HEDGE_BURST):
+        self._ratio = ratio
+        self._burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def on_call(self):
+        with self._lock:
+            self._tokens = min(self._burst, self._tokens + self._ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por tasa de error: se abre cuando, sobre las últimas
+    BREAKER_WINDOW llamadas, la proporción de fallos supera BREAKER_ERROR_RATE.
+    Tras BREAKER_COOLDOWN segundos deja pasar una única llamada de prueba (half-open).
+
+    allow_request() devuelve un ticket (o None si rechaza la llamada) que se pasa a
+    record_success/record_failure: solo el resultado de la llamada de prueba cierra o
+    reabre el circuito, y los de llamadas lanzadas antes de un cambio de estado se ignoran.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, window=BREAKER_WINDOW, min_requests=BREAKER_MIN_REQUESTS,
+                 error_rate=BREAKER_ERROR_RATE, cooldown=BREAKER_COOLDOWN):
+        self._results = deque(maxlen=window)
+        self._min_requests = min_requests
+        self._error_rate = error_rate
+        self._cooldown = cooldown
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        # Se incrementa en cada cambio de estado para reconocer tickets antiguos
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._cooldown:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self):
+        """Devuelve un ticket (generación, es_prueba) o None si el circuito rechaza la llamada"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return (self._generation, False)
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self._cooldown:
+                    return None
+                self._state = self.HALF_OPEN
+                self._generation += 1
+            # Half-open: solo una llamada de prueba a la vez
+            if self._trial_in_flight:
+                return None
+            self._trial_in_flight = True
+            return (self._generation, True)
+
+    def record_success(self, ticket):
+        with self._lock:
+            if self._is_trial(ticket):
+                self._state = self.CLOSED
+                self._generation += 1
+                self._trial_in_flight = False
+                self._results.clear()
+            elif self._is_current(ticket):
+                self._results.append(True)
+
+    def record_failure(self, ticket):
+        with self._lock:
+            if self._is_trial(ticket):
+                self._trip()
+            elif self._is_current(ticket):
+                self._results.append(False)
+                failures = self._results.count(False)
+                if (len(self._results) >= self._min_requests
+                        and failures / len(self._results) >= self._error_rate):
+                    self._trip()
+
+    def _is_trial(self, ticket):
+        return self._state == self.HALF_OPEN and ticket == (self._generation, True)
+
+    def _is_current(self, ticket):
+        return self._state == self.CLOSED and ticket == (self._generation, False)
+
+    def _trip(self):
+        self._state = self.OPEN
+        self._generation += 1
+        self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+        self._results.clear()
+
+
+class LambdaClient:
+    """
+    Cliente HTTP para una función Lambda con seguimiento de latencia,
+    circuit breaker y, para lecturas idempotentes, peticiones de cobertura
+    cuando la primera supera el p95 observado.
+    """
+
+    def __init__(self, name, url, hedge=False, timeout=LAMBDA_TIMEOUT):
+        self.name = name
+        self.url = url
+        self.hedge = hedge
+        self.timeout = timeout
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker()
+        self.hedge_budget = HedgeBudget()
+        self.hedges_sent = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, **kwargs):
+        """Lanza la petición; devuelve la respuesta o lanza CircuitOpenError / requests.RequestException"""
+        ticket = self.breaker.allow_request()
+        if ticket is None:
+            raise CircuitOpenError(f"Circuito abierto para {self.name}")
+
+        try:
+            if self.hedge and method == 'GET':
+                response = self._hedged(method, **kwargs)
+            else:
+                response = self._timed(method, **kwargs)
+        except Exception:
+            self.breaker.record_failure(ticket)
+            raise
+
+        # Los 4xx son errores de negocio (producto no encontrado, etc.), no del upstream
+        if response.status_code >= 500:
+            self.breaker.record_failure(ticket)
+        else:
+            self.breaker.record_success(ticket)
+        return response
+
+    def get(self, **kwargs):
+        return self.request('GET', **kwargs)
+
+    def post(self, **kwargs):
+        return self.request('POST', **kwargs)
+
+    def _timed(self, method, **kwargs):
+        # Los timeouts y errores de conexión también cuentan: son justo la cola lenta
+        start = time.monotonic()
+        try:
+            return requests.request(method, self.url, timeout=self.timeout, **kwargs)
+        finally:
+            self.latency.record(time.monotonic() - start)
+
+    def _hedged(self, method, **kwargs):
+        self.hedge_budget.on_call()
+        hedge_after = None
+        if self.latency.count() >= HEDGE_MIN_SAMPLES:
+            hedge_after = self.latency.percentile(95)
+
+        if hedge_after is None or hedge_after >= self.timeout:
+            return self._timed(method, **kwargs)
+
+        deadline = time.monotonic() + self.timeout
+        first = _submit(self._timed, method, **kwargs)
+        if first is None:
+            # Pool lleno: petición normal en el propio hilo, sin hedge
+            return self._timed(method, **kwargs)
+
+        done, _ = wait([first], timeout=hedge_after)
+        if done:
+            return first.result()
+
+        second = _submit(self._timed, method, **kwargs) if self.hedge_budget.try_spend() else None
+        if second is None:
+            pending = {first}
+        else:
+            logger.info(f"Hedge para {self.name}: sin respuesta tras p95={hedge_after:.3f}s")
+            with self._lock:
+                self.hedges_sent += 1
+            pending = {first, second}
+
+        response, error = None, None
+        # Nos quedamos con la primera respuesta correcta; la otra se abandona
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if response.status_code < 500:
+                    return response
+        if response is not None:
+            return response
+        if error is not None and not pending:
+            raise error
+        raise requests.Timeout(f"{self.name} sin respuesta en {self.timeout}s")
+
+    def stats(self):
+        p50 = self.latency.percentile(50)
+        p95 = self.latency.percentile(95)
+        return {
+            "configured": bool(self.url),
+            "circuit": self.breaker.state,
+            "samples": self.latency.count(),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedges_sent": self.hedges_sent
+        }